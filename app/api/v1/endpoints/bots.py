@@ -1,31 +1,51 @@
 import os
 import shutil
 import re
+from datetime import datetime, timezone
 from typing import List
 from bson import ObjectId
 
 from fastapi import (
     APIRouter, UploadFile, File, Depends, HTTPException, status
 )
+from starlette.background import BackgroundTask
 from starlette.responses import StreamingResponse
-from langchain_core.messages import HumanMessage, AIMessage
 
 from app.api.v1.deps import get_current_user, get_authenticated_user
 from app.schemas.user import User
 from app.schemas.bot import Bot, BotCreate, BotUpdate
 from app.db.session import bots_collection
 from app.core.rag_pipeline import RAGPipeline
+from app.core.sessions import ChatSession, session_store, history_to_messages
+from app.core.rate_limit import chat_admission, upload_admission
 
 router = APIRouter()
 
+# Deleted bots are tombstoned until the garbage collector removes them.
+ACTIVE = {"deleted_at": None}
+
 def strip_think_tags(text: str) -> str:
     """Removes <think> tags from the LLM response for a cleaner output."""
     return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
 
+async def get_chat_session(bot_id: str, request_data: dict, user_id: str) -> ChatSession:
+    """
+    Resumes the server-side session named by `session_id`, or starts a new one.
+    A client-supplied `chat_history` is only used to seed a new session.
+    """
+    session_id = request_data.get("session_id")
+    if session_id:
+        session = await session_store.get(session_id, bot_id, user_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        return session
+    seed = history_to_messages(request_data.get("chat_history", []))
+    return await session_store.create(bot_id, user_id, seed=seed)
+
 @router.get("/public/{bot_id}")
 async def get_public_bot_info(bot_id: str):
     try:
-        bot = await bots_collection.find_one({"_id": ObjectId(bot_id)})
+        bot = await bots_collection.find_one({"_id": ObjectId(bot_id), **ACTIVE})
         if not bot:
             raise HTTPException(status_code=404, detail="Bot not found")
         return {"id": str(bot["_id"]), "name": bot["name"]}
@@ -41,109 +61,128 @@ async def create_bot(bot_in: BotCreate, current_user: User = Depends(get_current
 
 @router.post("/{bot_id}/upload", status_code=status.HTTP_200_OK)
 async def upload_resume(bot_id: str, file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
-    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), "user_id": str(current_user.id)})
+    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), "user_id": str(current_user.id), **ACTIVE})
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    pipeline = RAGPipeline(bot_id=bot_id, user_id=str(current_user.id), bot_name=bot["name"])
-    
     file_location = f"/tmp/{file.filename}"
-    with open(file_location, "wb+") as file_object:
-        shutil.copyfileobj(file.file, file_object)
-
+    lease = await upload_admission.acquire(str(current_user.id))
     try:
-        pipeline.process_file(file_location)
+        pipeline = RAGPipeline(bot_id=bot_id, user_id=str(current_user.id), bot_name=bot["name"])
+
+        with open(file_location, "wb+") as file_object:
+            shutil.copyfileobj(file.file, file_object)
+
+        await pipeline.load_and_index_document(file_location)
         return {"message": f"Successfully uploaded and indexed resume for bot '{bot['name']}'"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     finally:
+        lease.release()
         if os.path.exists(file_location):
             os.remove(file_location)
 
 @router.post("/{bot_id}/chat")
 async def chat_with_bot(bot_id: str, request_data: dict, authenticated_user: dict = Depends(get_authenticated_user)):
     user_message = request_data.get("message")
-    chat_history_raw = request_data.get("chat_history", [])
 
-    bot = await bots_collection.find_one({"_id": ObjectId(bot_id)})
+    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), **ACTIVE})
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     if str(bot.get("user_id")) != str(authenticated_user.get("_id")):
         raise HTTPException(status_code=403, detail="You do not have permission for this bot")
 
-    pipeline = RAGPipeline(bot_id=bot_id, user_id=str(bot["user_id"]), bot_name=bot["name"])
-    
-    chat_history = [HumanMessage(content=msg["content"]) if msg["type"] == "user" else AIMessage(content=msg["content"]) for msg in chat_history_raw]
-    
-    full_response = ""
-    # We simulate a non-streaming response from the stream for this endpoint.
-    async for chunk in pipeline.get_response_stream(user_message, chat_history):
-        if "answer" in chunk:
-            full_response += chunk["answer"]
+    # Admit the request before creating a session so shed requests cost nothing.
+    lease = await chat_admission.acquire(str(authenticated_user["_id"]))
+    try:
+        session = await get_chat_session(bot_id, request_data, str(authenticated_user["_id"]))
+        pipeline = RAGPipeline(bot_id=bot_id, user_id=str(bot["user_id"]), bot_name=bot["name"])
+        
+        full_response = ""
+        # We simulate a non-streaming response from the stream for this endpoint.
+        async for chunk in pipeline.get_response_stream(user_message, session.chat_history()):
+            if "answer" in chunk:
+                full_response += chunk["answer"]
+    finally:
+        lease.release()
 
-    return {"reply": strip_think_tags(full_response)}
+    reply = strip_think_tags(full_response)
+    await session_store.record_turn(session, user_message, reply)
+    return {"reply": reply, "session_id": session.session_id}
 
 
 @router.post("/{bot_id}/chat/stream")
 async def chat_with_bot_stream(bot_id: str, request_data: dict, authenticated_user: dict = Depends(get_authenticated_user)):
     user_message = request_data.get("message")
-    chat_history_raw = request_data.get("chat_history", [])
 
-    bot = await bots_collection.find_one({"_id": ObjectId(bot_id)})
+    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), **ACTIVE})
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     if str(bot.get("user_id")) != str(authenticated_user.get("_id")):
         raise HTTPException(status_code=403, detail="You do not have permission for this bot")
 
-    pipeline = RAGPipeline(bot_id=bot_id, user_id=str(bot["user_id"]), bot_name=bot["name"])
-
-    chat_history = [HumanMessage(content=msg["content"]) if msg["type"] == "user" else AIMessage(content=msg["content"]) for msg in chat_history_raw]
+    # Admit the request before creating a session so shed requests cost nothing.
+    lease = await chat_admission.acquire(str(authenticated_user["_id"]))
+    try:
+        session = await get_chat_session(bot_id, request_data, str(authenticated_user["_id"]))
+        pipeline = RAGPipeline(bot_id=bot_id, user_id=str(bot["user_id"]), bot_name=bot["name"])
+    except Exception:
+        lease.release()
+        raise
 
     # --- THIS IS THE FIX ---
     # Define a new async generator that wraps the original stream,
     # buffers the content, cleans it, and then yields the final result.
     async def clean_stream_generator():
         full_response_chunks = []
-        async for chunk in pipeline.get_response_stream(user_message, chat_history):
-            if "answer" in chunk:
-                 full_response_chunks.append(chunk["answer"])
+        try:
+            async for chunk in pipeline.get_response_stream(user_message, session.chat_history()):
+                if "answer" in chunk:
+                     full_response_chunks.append(chunk["answer"])
+        finally:
+            lease.release()
         
         full_response = "".join(full_response_chunks)
         cleaned_response = strip_think_tags(full_response)
         yield cleaned_response
+        await session_store.record_turn(session, user_message, cleaned_response)
     # --- END OF FIX ---
 
     return StreamingResponse(
         clean_stream_generator(), # Use the new cleaning generator
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers={"X-Session-Id": session.session_id},
+        # Frees the slot even if the client disconnects before the stream starts
+        background=BackgroundTask(lease.release)
     )
 
 @router.get("/", response_model=List[Bot])
 async def get_user_bots(current_user: User = Depends(get_current_user)):
-    bots = await bots_collection.find({"user_id": str(current_user.id)}).to_list(100)
+    bots = await bots_collection.find({"user_id": str(current_user.id), **ACTIVE}).to_list(100)
     return bots
     
 @router.delete("/{bot_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_bot(bot_id: str, current_user: User = Depends(get_current_user)):
-    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), "user_id": str(current_user.id)})
+    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), "user_id": str(current_user.id), **ACTIVE})
     if not bot:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bot not found")
 
-    await bots_collection.delete_one({"_id": ObjectId(bot_id)})
-    user_data_dir = os.path.join("data", str(current_user.id), bot_id)
-    if os.path.exists(user_data_dir):
-        shutil.rmtree(user_data_dir)
+    # Files, sessions and cached results are removed in the background by app.core.garbage_collector.
+    await bots_collection.update_one(
+        {"_id": ObjectId(bot_id)},
+        {"$set": {"deleted_at": datetime.now(timezone.utc)}}
+    )
     return
 
 @router.patch("/{bot_id}", response_model=Bot)
 async def update_bot(bot_id: str, bot_in: BotUpdate, current_user: User = Depends(get_current_user)):
-    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), "user_id": str(current_user.id)})
+    bot = await bots_collection.find_one({"_id": ObjectId(bot_id), "user_id": str(current_user.id), **ACTIVE})
     if not bot:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bot not found")
         
     update_data = bot_in.model_dump(exclude_unset=True)
     await bots_collection.update_one({"_id": ObjectId(bot_id)}, {"$set": update_data})
-    updated_bot = await bots_collection.find_one({"_id": ObjectId(bot_id)})
+    updated_bot = await bots_collection.find_one({"_id": ObjectId(bot_id), **ACTIVE})
     return updated_bot
\ No newline at end of file
@@ -24,6 +24,38 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str
     GITHUB_CLIENT_ID: str
     GITHUB_CLIENT_SECRET: str
+    # Server-side chat sessions
+    SESSION_CACHE_SIZE: int = 1000  # sessions kept in memory
+    SESSION_MAX_MESSAGES: int = 12  # recent messages kept verbatim, older ones are summarized
+    SESSION_SUMMARY_MAX_CHARS: int = 2000
+    SESSION_FLUSH_BATCH: int = 6  # buffered messages per Mongo write
+    SESSION_TTL_SECONDS: int = 7 * 24 * 60 * 60  # idle sessions are expired by Mongo
+    # Per-tenant admission control for chat and upload requests
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per worker) or "mongo" (shared)
+    RATE_LIMIT_MAX_QUEUE: int = 8  # requests allowed to wait for an in-flight slot
+    RATE_LIMIT_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    CHAT_RATE_LIMIT_PER_MINUTE: int = 30
+    CHAT_RATE_LIMIT_BURST: int = 10
+    CHAT_MAX_IN_FLIGHT: int = 4
+    UPLOAD_RATE_LIMIT_PER_MINUTE: int = 6
+    UPLOAD_RATE_LIMIT_BURST: int = 2
+    UPLOAD_MAX_IN_FLIGHT: int = 1
+    # Indexing
+    EMBEDDING_MODEL: str = "BAAI/bge-small-en-v1.5"
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
+    # Retrieval
+    RETRIEVAL_TOP_K: int = 4
+    RETRIEVAL_CACHE_SIZE: int = 5000  # cached (bot, index version, query) results
+    # Background garbage collection of deleted bots and orphaned data
+    GC_ENABLED: bool = True
+    GC_INTERVAL_SECONDS: int = 60
+    GC_BATCH_SIZE: int = 20  # deleted bots collected per run
+    GC_FILES_PER_BATCH: int = 200
+    GC_MAX_BYTES_PER_SECOND: int = 20 * 1024 * 1024
+    GC_ORPHAN_SCAN_INTERVAL_SECONDS: int = 60 * 60
+    GC_ORPHAN_MIN_AGE_SECONDS: int = 60 * 60
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,200 @@
+# app/core/garbage_collector.py
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.retrieval_cache import retrieval_cache
+from app.core.sessions import session_store
+from app.db.session import bots_collection, chat_sessions_collection
+
+DATA_DIR = Path("data")
+# A claimed bot is retried by another worker if it isn't finished within this time.
+_CLAIM_TIMEOUT = timedelta(minutes=30)
+
+
+def _scan_tree(root: Path) -> List[Tuple[str, int, bool]]:
+    """Lists (path, size, is_dir) under root in an order that can be deleted front to back."""
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            entries.append((path, os.lstat(path).st_size, False))
+        for name in dirnames:
+            path = os.path.join(dirpath, name)
+            # Index directories are symlinks to versioned directories; unlink those.
+            entries.append((path, 0, not os.path.islink(path)))
+    entries.append((str(root), 0, True))
+    return entries
+
+
+def _delete_entries(entries: List[Tuple[str, int, bool]]):
+    for path, _, is_dir in entries:
+        try:
+            if is_dir:
+                os.rmdir(path)
+            else:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class DataGarbageCollector:
+    """
+    Background task that removes the data of tombstoned bots and orphaned
+    directories under data/. File deletions run in worker threads, in small
+    batches throttled to GC_MAX_BYTES_PER_SECOND so request latency isn't hurt.
+    """
+    def __init__(self, data_dir: Path = DATA_DIR):
+        self.data_dir = data_dir
+        self.reclaimed_bytes = 0
+        self.collected_bots = 0
+        self.removed_orphans = 0
+        self._task: Optional[asyncio.Task] = None
+        self._last_orphan_scan = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.collect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Garbage collection failed: {e}")
+            await asyncio.sleep(settings.GC_INTERVAL_SECONDS)
+
+    async def collect(self):
+        reclaimed = self.reclaimed_bytes
+        bots = await self.collect_tombstoned_bots()
+        orphans = 0
+        if time.monotonic() - self._last_orphan_scan >= settings.GC_ORPHAN_SCAN_INTERVAL_SECONDS:
+            self._last_orphan_scan = time.monotonic()
+            orphans = await self.collect_orphans()
+        if bots or orphans:
+            print(
+                f"Garbage collection: removed {bots} deleted bots and {orphans} orphaned directories, "
+                f"reclaimed {self.reclaimed_bytes - reclaimed} bytes"
+            )
+
+    async def collect_tombstoned_bots(self) -> int:
+        collected = 0
+        while collected < settings.GC_BATCH_SIZE:
+            now = datetime.now(timezone.utc)
+            # Claim the bot so other workers don't collect it at the same time.
+            bot = await bots_collection.find_one_and_update(
+                {
+                    "deleted_at": {"$ne": None},
+                    "$or": [{"gc_claimed_at": None}, {"gc_claimed_at": {"$lt": now - _CLAIM_TIMEOUT}}],
+                },
+                {"$set": {"gc_claimed_at": now}},
+            )
+            if not bot:
+                break
+            bot_id, user_id = str(bot["_id"]), str(bot.get("user_id"))
+            retrieval_cache.invalidate(bot_id)
+            await session_store.drop_bot(bot_id)
+            # Both the current and the legacy data/<bot_id> layout
+            await self._remove_tree(self.data_dir / user_id / bot_id)
+            await self._remove_tree(self.data_dir / bot_id)
+            self._remove_if_empty(self.data_dir / user_id)
+            await bots_collection.delete_one({"_id": bot["_id"]})
+            collected += 1
+        self.collected_bots += collected
+        return collected
+
+    async def collect_orphans(self) -> int:
+        """
+        Removes data/ directories and chat sessions whose bots no longer exist in
+        bots_collection, e.g. sessions written back by another worker after deletion.
+        """
+        bots = await bots_collection.find({}, {"_id": 1}).to_list(None)
+        known = {str(bot["_id"]) for bot in bots}
+        cutoff = time.time() - settings.GC_ORPHAN_MIN_AGE_SECONDS
+        result = await chat_sessions_collection.delete_many({
+            "bot_id": {"$nin": list(known)},
+            # Skip recent sessions in case their bot was created after the lookup above.
+            "updated_at": {"$lt": datetime.fromtimestamp(cutoff, timezone.utc)},
+        })
+        if result.deleted_count:
+            print(f"Garbage collection: removed {result.deleted_count} orphaned chat sessions")
+
+        orphans = await asyncio.to_thread(self._find_orphan_dirs, known, cutoff)
+
+        removed = 0
+        for orphan in orphans:
+            await self._remove_tree(orphan)
+            removed += 1
+        self.removed_orphans += removed
+        return removed
+
+    def _find_orphan_dirs(self, known: set, cutoff: float) -> List[Path]:
+        """Scans the top two levels of data/ for orphans; runs in a worker thread."""
+        orphans = []
+        for entry in self._list_dirs(self.data_dir):
+            if entry.name in known or not ObjectId.is_valid(entry.name):
+                continue
+            children = [child for child in self._list_dirs(entry) if ObjectId.is_valid(child.name)]
+            if any(child.name in known for child in children):
+                # A user directory: only its unknown bot directories are orphans.
+                orphans.extend(child for child in children if child.name not in known)
+            else:
+                orphans.append(entry)
+
+        def is_old(path: Path) -> bool:
+            # Skip fresh directories in case their bot was created after the lookup.
+            try:
+                return path.stat().st_mtime <= cutoff
+            except FileNotFoundError:
+                return False
+
+        return [orphan for orphan in orphans if is_old(orphan)]
+
+    @staticmethod
+    def _list_dirs(path: Path) -> List[Path]:
+        if not path.is_dir():
+            return []
+        return [p for p in path.iterdir() if p.is_dir() and not p.is_symlink()]
+
+    @staticmethod
+    def _remove_if_empty(path: Path):
+        try:
+            path.rmdir()
+        except OSError:
+            pass
+
+    async def _remove_tree(self, root: Path):
+        if not root.is_dir():
+            return
+        entries = await asyncio.to_thread(_scan_tree, root)
+        batch_size = settings.GC_FILES_PER_BATCH
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            started = time.monotonic()
+            await asyncio.to_thread(_delete_entries, batch)
+            batch_bytes = sum(size for _, size, _ in batch)
+            self.reclaimed_bytes += batch_bytes
+            # Stay within the I/O budget before deleting the next batch.
+            budget_time = batch_bytes / settings.GC_MAX_BYTES_PER_SECOND
+            await asyncio.sleep(max(0.0, budget_time - (time.monotonic() - started)))
+
+
+garbage_collector = DataGarbageCollector()
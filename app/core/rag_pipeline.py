@@ -1,6 +1,10 @@
 import os
 import json
+import asyncio
+import shutil
+import time
 from pathlib import Path
+from typing import List, Optional
 import pdfplumber
 from docx import Document as DocxDocument
 
@@ -14,6 +18,9 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, AIMessage
 from app.core.config import settings
+from app.core.retrieval_cache import CachedFAISSRetriever, retrieval_cache
+
+SOURCE_EXTENSIONS = (".pdf", ".docx", ".txt", ".json")
 
 def get_file_extension(filename: str) -> str:
     return os.path.splitext(filename)[1]
@@ -53,6 +60,71 @@ def extract_text_from_file(file_path: Path) -> str:
     else:
         raise ValueError(f"Unsupported file type: {file_path.suffix}")
 
+def split_text(text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[Document]:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+    )
+    return text_splitter.split_documents([Document(page_content=text)])
+
+def find_source_documents(data_path: Path) -> List[Path]:
+    """Returns the source documents stored for a bot, newest first."""
+    if not data_path.is_dir():
+        return []
+    sources = [p for p in data_path.iterdir() if p.is_file() and p.suffix in SOURCE_EXTENSIONS]
+    return sorted(sources, key=lambda p: p.stat().st_mtime, reverse=True)
+
+def save_index_atomically(vector_store: FAISS, index_path: Path):
+    """
+    Saves the index into a new versioned directory and atomically repoints the
+    `index_path` symlink at it, so readers always see a complete index.
+    The previous version is kept until the next swap for readers still loading it.
+    """
+    stamp = time.time_ns()
+    version_dir = index_path.with_name(f"{index_path.name}.{stamp}")
+    vector_store.save_local(str(version_dir))
+
+    link_tmp = index_path.with_name(f"{index_path.name}.{stamp}.link")
+    try:
+        os.symlink(version_dir.name, link_tmp, target_is_directory=True)
+    except OSError:
+        # No symlink support (e.g. Windows without privileges): fall back to a rename swap.
+        if index_path.is_symlink():
+            index_path.unlink()
+        elif index_path.exists():
+            shutil.rmtree(index_path)
+        os.rename(version_dir, index_path)
+        return
+
+    if index_path.exists() and not index_path.is_symlink():
+        # Indexes written before versioning are plain directories; move it aside once.
+        os.rename(index_path, index_path.with_name(f"{index_path.name}.0"))
+    os.replace(link_tmp, index_path)
+
+    for old_version in _index_versions(index_path)[:-2]:
+        shutil.rmtree(old_version, ignore_errors=True)
+
+def _index_versions(index_path: Path) -> List[Path]:
+    """Versioned `<index>.<n>` directories next to index_path, oldest first."""
+    return sorted(
+        (p for p in index_path.parent.glob(f"{index_path.name}.*")
+         if p.is_dir() and not p.is_symlink() and p.name.split(".")[-1].isdigit()),
+        key=lambda p: int(p.name.split(".")[-1]),
+    )
+
+def resolve_index_dir(index_path: Path) -> Optional[Path]:
+    """
+    Returns the directory holding the current index. The first swap of a plain
+    directory index moves it aside before the symlink takes its place; in that
+    short gap the newest version directory is already complete, so use it.
+    """
+    if index_path.exists():
+        return index_path.resolve()
+    for version_dir in reversed(_index_versions(index_path)):
+        if (version_dir / "index.faiss").exists():
+            return version_dir
+    return None
+
 class RAGPipeline:
     def __init__(self, bot_id: str, user_id: str, bot_name: str):
         self.bot_id = bot_id
@@ -60,8 +132,9 @@ class RAGPipeline:
         self.bot_name = bot_name
         self.data_path = Path("data") / user_id / bot_id
         self.index_path = self.data_path / "faiss_index"
+        self.index_version = ""
         
-        self.embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
+        self.embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
         
         self.llm = ChatGroq(
             model_name="qwen/qwen3-32b", 
@@ -72,14 +145,23 @@ class RAGPipeline:
         self.vector_store = self._load_vector_store()
         self.retrieval_chain = self._create_retrieval_chain()
 
+    def _read_index_version(self, index_dir: Path) -> str:
+        # The index file changes on every re-index, so its mtime and size identify the version.
+        stat = (index_dir / "index.faiss").stat()
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
     def _load_vector_store(self):
-        if self.index_path.exists():
+        # Resolve the symlink once so a concurrent swap can't mix two versions.
+        index_dir = resolve_index_dir(self.index_path)
+        if index_dir is not None:
             try:
-                return FAISS.load_local(
-                    str(self.index_path), 
+                vector_store = FAISS.load_local(
+                    str(index_dir), 
                     self.embeddings, 
                     allow_dangerous_deserialization=True
                 )
+                self.index_version = self._read_index_version(index_dir)
+                return vector_store
             except Exception as e:
                 print(f"Error loading vector store: {e}")
                 return None
@@ -122,18 +204,37 @@ Example: <think>The user is asking about the candidate's experience with Python.
         )
         
         question_answer_chain = create_stuff_documents_chain(self.llm, prompt)
-        return create_retrieval_chain(self.vector_store.as_retriever(), question_answer_chain)
+        retriever = CachedFAISSRetriever(
+            vector_store=self.vector_store,
+            bot_id=self.bot_id,
+            index_version=self.index_version,
+            k=settings.RETRIEVAL_TOP_K,
+        )
+        return create_retrieval_chain(retriever, question_answer_chain)
 
-    async def load_and_index_document(self, file_path: str):
-        text_content = extract_text_from_file(Path(file_path))
-        documents = [Document(page_content=text_content)]
-        
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(documents)
+    def _build_index(self, source_path: Path) -> FAISS:
+        """Extracts, embeds and saves the document. Blocking; runs in a worker thread."""
+        text_content = extract_text_from_file(source_path)
+        splits = split_text(text_content)
 
         self.data_path.mkdir(parents=True, exist_ok=True)
-        self.vector_store = FAISS.from_documents(documents=splits, embedding=self.embeddings)
-        self.vector_store.save_local(str(self.index_path))
+        vector_store = FAISS.from_documents(documents=splits, embedding=self.embeddings)
+        save_index_atomically(vector_store, self.index_path)
+
+        # Keep the source next to the index so it can be re-indexed later.
+        stored_path = self.data_path / source_path.name
+        if source_path.resolve() != stored_path.resolve():
+            shutil.copy2(source_path, stored_path)
+        for old_source in find_source_documents(self.data_path):
+            if old_source.name != stored_path.name:
+                old_source.unlink()
+        return vector_store
+
+    async def load_and_index_document(self, file_path: str):
+        # Extraction and embedding are CPU bound; keep them off the event loop.
+        self.vector_store = await asyncio.to_thread(self._build_index, Path(file_path))
+        self.index_version = self._read_index_version(resolve_index_dir(self.index_path))
+        retrieval_cache.invalidate(self.bot_id)
         
         self.retrieval_chain = self._create_retrieval_chain()
         return True
@@ -0,0 +1,253 @@
+# app/core/rate_limit.py
+
+import asyncio
+import math
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.db.session import rate_limits_collection
+
+# Idle tenants are swept once the state table grows past this size,
+# at most once per _SWEEP_INTERVAL seconds.
+_SWEEP_THRESHOLD = 10_000
+_SWEEP_INTERVAL = 60.0
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is shed. Turned into a 429 with `Retry-After` in app.main."""
+    def __init__(self, retry_after: float, detail: str = "Too many requests"):
+        super().__init__(detail)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self) -> float:
+        """Takes one token. Returns 0 on success, otherwise the seconds until one is available."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class MemoryRateBackend:
+    """Per-process token buckets."""
+    def __init__(self, per_minute: int, burst: int):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._last_sweep = time.monotonic()
+
+    async def consume(self, key: str) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        now = time.monotonic()
+        if len(self._buckets) > _SWEEP_THRESHOLD and now - self._last_sweep >= _SWEEP_INTERVAL:
+            self._last_sweep = now
+            self._buckets = {k: b for k, b in self._buckets.items() if k == key or not b.is_full()}
+        return bucket.consume()
+
+    async def refund(self, key: str):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.refund()
+
+
+class MongoRateBackend:
+    """
+    Fixed one-minute windows counted in Mongo, shared by every worker.
+    Window documents expire through a TTL index.
+    """
+    def __init__(self, collection, scope: str, per_minute: int, burst: int):
+        self.collection = collection
+        self.scope = scope
+        self.limit = per_minute + burst
+        self._index_ready = False
+
+    async def consume(self, key: str) -> float:
+        if not self._index_ready:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._index_ready = True
+        now = time.time()
+        window = int(now // 60)
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{self.scope}:{key}:{window}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"expires_at": datetime.now(timezone.utc) + timedelta(minutes=2)},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["count"] <= self.limit:
+            return 0.0
+        return (window + 1) * 60 - now
+
+    async def refund(self, key: str):
+        # If the window has rolled over there is nothing left to give back.
+        window = int(time.time() // 60)
+        await self.collection.update_one(
+            {"_id": f"{self.scope}:{key}:{window}", "count": {"$gt": 0}},
+            {"$inc": {"count": -1}},
+        )
+
+
+class _Tenant:
+    __slots__ = ("in_flight", "waiters")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class Lease:
+    """An admitted request slot. Releasing more than once is a no-op."""
+    def __init__(self, controller: "AdmissionController", key: str):
+        self._controller = controller
+        self._key = key
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self._key)
+
+
+class AdmissionController:
+    """
+    Per-tenant admission control: a rate limit from `backend` followed by a cap on
+    in-flight requests. Requests over the cap wait in a short queue with a deadline
+    and are shed once the queue is full or the deadline passes.
+    """
+    def __init__(self, name: str, backend, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._tenants: Dict[str, _Tenant] = {}
+
+    def _queue_full(self, key: str) -> bool:
+        tenant = self._tenants.get(key)
+        return (
+            tenant is not None
+            and (tenant.in_flight >= self.max_in_flight or tenant.waiters)
+            and len(tenant.waiters) >= self.max_queue
+        )
+
+    async def acquire(self, key: str) -> Lease:
+        # Shed on concurrency before spending a token, so clients retrying after a
+        # "too many concurrent" 429 don't also drain their rate limit.
+        if self._queue_full(key):
+            raise RateLimitExceeded(self.queue_timeout, f"Too many concurrent {self.name} requests")
+        retry_after = await self.backend.consume(key)
+        if retry_after > 0:
+            raise RateLimitExceeded(retry_after, f"Rate limit exceeded for {self.name} requests")
+
+        tenant = self._tenants.get(key)
+        if tenant is None:
+            tenant = self._tenants[key] = _Tenant()
+        if tenant.in_flight < self.max_in_flight and not tenant.waiters:
+            tenant.in_flight += 1
+            return Lease(self, key)
+        if len(tenant.waiters) >= self.max_queue:
+            # The queue filled up while the token was being taken.
+            await self.backend.refund(key)
+            raise RateLimitExceeded(self.queue_timeout, f"Too many concurrent {self.name} requests")
+
+        waiter = asyncio.get_running_loop().create_future()
+        tenant.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self._release(key)
+            else:
+                waiter.cancel()
+                try:
+                    tenant.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            # The request never ran, so give its token back.
+            await self.backend.refund(key)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise RateLimitExceeded(self.queue_timeout, f"Too many concurrent {self.name} requests")
+        return Lease(self, key)
+
+    def _release(self, key: str):
+        tenant = self._tenants.get(key)
+        if tenant is None:
+            return
+        while tenant.waiters:
+            waiter = tenant.waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; in_flight is unchanged.
+                waiter.set_result(None)
+                return
+        tenant.in_flight -= 1
+        if tenant.in_flight <= 0:
+            del self._tenants[key]
+
+
+class _NoLimit:
+    async def consume(self, key: str) -> float:
+        return 0.0
+
+    async def refund(self, key: str):
+        pass
+
+
+def _build(name: str, per_minute: int, burst: int, max_in_flight: int) -> AdmissionController:
+    if not settings.RATE_LIMIT_ENABLED:
+        return AdmissionController(name, _NoLimit(), max_in_flight=10**9, max_queue=0, queue_timeout=0)
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        backend = MongoRateBackend(rate_limits_collection, name, per_minute, burst)
+    else:
+        backend = MemoryRateBackend(per_minute, burst)
+    return AdmissionController(
+        name,
+        backend,
+        max_in_flight=max_in_flight,
+        max_queue=settings.RATE_LIMIT_MAX_QUEUE,
+        queue_timeout=settings.RATE_LIMIT_QUEUE_TIMEOUT_SECONDS,
+    )
+
+
+chat_admission = _build(
+    "chat",
+    settings.CHAT_RATE_LIMIT_PER_MINUTE,
+    settings.CHAT_RATE_LIMIT_BURST,
+    settings.CHAT_MAX_IN_FLIGHT,
+)
+upload_admission = _build(
+    "upload",
+    settings.UPLOAD_RATE_LIMIT_PER_MINUTE,
+    settings.UPLOAD_RATE_LIMIT_BURST,
+    settings.UPLOAD_MAX_IN_FLIGHT,
+)
@@ -0,0 +1,118 @@
+# app/core/retrieval_cache.py
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.core.config import settings
+
+# (chunk id, distance) pairs for one query
+Hits = List[Tuple[str, float]]
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds, collapses whitespace and drops surrounding punctuation."""
+    return re.sub(r"\s+", " ", query.casefold()).strip(" \t\n?!.,;:")
+
+
+class RetrievalCache:
+    """
+    LRU of retrieval results keyed by (bot_id, index version, normalized query).
+    Only chunk ids and scores are kept; documents are read back from the bot's docstore.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], Hits]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bot_id: str, version: str, query: str) -> Optional[Hits]:
+        key = (bot_id, version, normalize_query(query))
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hits
+
+    def put(self, bot_id: str, version: str, query: str, hits: Hits):
+        if self.capacity <= 0:
+            return
+        key = (bot_id, version, normalize_query(query))
+        with self._lock:
+            self._entries[key] = hits
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bot_id: str):
+        """Drops every entry for a bot, e.g. after it is re-indexed."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == bot_id]:
+                del self._entries[key]
+
+
+retrieval_cache = RetrievalCache(settings.RETRIEVAL_CACHE_SIZE)
+
+
+class CachedFAISSRetriever(BaseRetriever):
+    """
+    Top-k FAISS retriever that consults `retrieval_cache` first, so repeated
+    questions skip both the query embedding and the index search.
+    """
+    vector_store: Any
+    bot_id: str
+    index_version: str
+    k: int = 4
+
+    def _chunk_ids(self) -> Dict[int, str]:
+        """Maps the docstore's document objects back to their chunk ids."""
+        store = self.vector_store
+        return {id(store.docstore.search(chunk_id)): chunk_id for chunk_id in store.index_to_docstore_id.values()}
+
+    def _search(self, query: str) -> Tuple[List[Document], Optional[Hits]]:
+        """Runs the same public search as `as_retriever()`. Hits are None if a result has no known id."""
+        embedding = self.vector_store.embeddings.embed_query(query)
+        results = self.vector_store.similarity_search_with_score_by_vector(embedding, k=self.k)
+        documents = [document for document, _ in results]
+        chunk_ids = None
+        hits = []
+        for document, score in results:
+            chunk_id = getattr(document, "id", None)
+            if chunk_id is None:
+                chunk_ids = chunk_ids if chunk_ids is not None else self._chunk_ids()
+                chunk_id = chunk_ids.get(id(document))
+            if chunk_id is None:
+                return documents, None
+            hits.append((chunk_id, float(score)))
+        return documents, hits
+
+    def _lookup(self, hits: Hits) -> Optional[List[Document]]:
+        documents = []
+        for chunk_id, _ in hits:
+            document = self.vector_store.docstore.search(chunk_id)
+            if not isinstance(document, Document):
+                return None
+            documents.append(document)
+        return documents
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        hits = retrieval_cache.get(self.bot_id, self.index_version, query)
+        if hits is not None:
+            documents = self._lookup(hits)
+            if documents is not None:
+                return documents
+        documents, hits = self._search(query)
+        if hits is not None:
+            retrieval_cache.put(self.bot_id, self.index_version, query, hits)
+        return documents
@@ -0,0 +1,210 @@
+# app/core/sessions.py
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from bson import ObjectId
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from app.core.config import settings
+from app.db.session import chat_sessions_collection
+
+# Turns are stored compactly in Mongo as {"t": "u" | "a", "c": content}.
+_USER = "u"
+_AI = "a"
+_SUMMARY_LINE_CHARS = 240
+
+
+def _to_message(turn: dict) -> BaseMessage:
+    if turn["t"] == _USER:
+        return HumanMessage(content=turn["c"])
+    return AIMessage(content=turn["c"])
+
+
+def _to_turn(message: BaseMessage) -> dict:
+    return {"t": _USER if isinstance(message, HumanMessage) else _AI, "c": message.content}
+
+
+def history_to_messages(chat_history_raw: list) -> List[BaseMessage]:
+    """Converts the client-side `chat_history` format into LangChain messages."""
+    return [
+        HumanMessage(content=msg["content"]) if msg["type"] == "user" else AIMessage(content=msg["content"])
+        for msg in chat_history_raw
+    ]
+
+
+class ChatSession:
+    """
+    A single conversation with a bot. Keeps the most recent messages verbatim
+    and folds older ones into a bounded running summary.
+    """
+    def __init__(self, session_id: str, bot_id: str, user_id: str,
+                 summary: str = "", messages: Optional[List[BaseMessage]] = None, persist: bool = True):
+        self.session_id = session_id
+        self.bot_id = bot_id
+        self.user_id = user_id
+        self.summary = summary
+        self.messages: List[BaseMessage] = messages or []
+        self.pending: List[dict] = []
+        self.summary_dirty = False
+        self.is_new = True
+        # Whether the session may be written to Mongo yet
+        self.persist = persist
+        # Set once the bot is deleted; the session must never be cached or written again
+        self.dropped = False
+
+    def chat_history(self) -> List[BaseMessage]:
+        """Returns the prompt history: the running summary followed by the recent turns."""
+        if not self.summary:
+            return list(self.messages)
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")] + self.messages
+
+    def append(self, message: BaseMessage):
+        self.messages.append(message)
+        self.pending.append(_to_turn(message))
+        self._roll_up()
+
+    def _roll_up(self):
+        overflow = len(self.messages) - settings.SESSION_MAX_MESSAGES
+        if overflow <= 0:
+            return
+        rolled, self.messages = self.messages[:overflow], self.messages[overflow:]
+        lines = []
+        for message in rolled:
+            speaker = "User" if isinstance(message, HumanMessage) else "Assistant"
+            text = " ".join(str(message.content).split())
+            if len(text) > _SUMMARY_LINE_CHARS:
+                text = text[:_SUMMARY_LINE_CHARS] + "..."
+            lines.append(f"- {speaker}: {text}")
+        summary = "\n".join(filter(None, [self.summary] + lines))
+        # Keep the newest part of the summary so the prompt size stays constant.
+        if len(summary) > settings.SESSION_SUMMARY_MAX_CHARS:
+            summary = summary[-settings.SESSION_SUMMARY_MAX_CHARS:]
+            summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+        self.summary = summary
+        self.summary_dirty = True
+
+
+class SessionStore:
+    """
+    Bounded in-memory LRU of chat sessions backed by a Mongo collection.
+    New turns are buffered and written to Mongo in batched appends.
+    """
+    def __init__(self, collection, capacity: int):
+        self.collection = collection
+        self.capacity = capacity
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._index_ready = False
+
+    async def create(self, bot_id: str, user_id: str, seed: Optional[List[BaseMessage]] = None) -> ChatSession:
+        # Sessions seeded from a client-sent chat_history usually come from clients that
+        # never send the session_id back, so they stay in memory until they are resumed.
+        session = ChatSession(str(ObjectId()), bot_id, user_id, persist=not seed)
+        for message in seed or []:
+            session.append(message)
+        await self._flush_evicted(self._put(session))
+        return session
+
+    async def get(self, session_id: str, bot_id: str, user_id: str) -> Optional[ChatSession]:
+        """Returns the session if it exists and belongs to the given bot and user."""
+        if not ObjectId.is_valid(session_id):
+            return None
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            session.persist = True
+        else:
+            doc = await self.collection.find_one({"_id": ObjectId(session_id)})
+            if not doc:
+                return None
+            # Another request may have loaded the same session while we waited.
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ChatSession(
+                    session_id, doc["bot_id"], doc["user_id"],
+                    summary=doc.get("summary", ""),
+                    messages=[_to_message(turn) for turn in doc.get("turns", [])],
+                )
+                session.is_new = False
+                await self._flush_evicted(self._put(session))
+        if session.bot_id != bot_id or session.user_id != user_id:
+            return None
+        return session
+
+    async def record_turn(self, session: ChatSession, user_message: str, reply: str):
+        session.append(HumanMessage(content=user_message))
+        session.append(AIMessage(content=reply))
+        if not session.dropped and self._sessions.get(session.session_id) is not session:
+            # Evicted while the request was running: cache it again so the new turns
+            # are flushed with it rather than lost.
+            await self._flush_evicted(self._put(session))
+        if session.persist and (len(session.pending) >= settings.SESSION_FLUSH_BATCH or session.is_new):
+            await self.flush(session)
+
+    async def flush(self, session: ChatSession):
+        if not session.persist:
+            return
+        if not session.pending and not session.summary_dirty and not session.is_new:
+            return
+        if not self._index_ready:
+            await self.collection.create_index("updated_at", expireAfterSeconds=settings.SESSION_TTL_SECONDS)
+            self._index_ready = True
+        pending, session.pending = session.pending, []
+        update = {
+            "$set": {
+                "bot_id": session.bot_id,
+                "user_id": session.user_id,
+                "summary": session.summary,
+                "updated_at": datetime.now(timezone.utc),
+            },
+            "$push": {"turns": {"$each": pending, "$slice": -settings.SESSION_MAX_MESSAGES}},
+        }
+        try:
+            # Only a new session may create its document; otherwise a session of a
+            # deleted bot still held in memory would bring its document back.
+            await self.collection.update_one(
+                {"_id": ObjectId(session.session_id)}, update, upsert=session.is_new
+            )
+        except Exception:
+            session.pending = pending + session.pending
+            raise
+        session.summary_dirty = False
+        session.is_new = False
+
+    async def flush_all(self):
+        await self._flush_evicted(list(self._sessions.values()))
+
+    async def drop_bot(self, bot_id: str):
+        """Forgets every session of a bot, in memory and in Mongo."""
+        for session_id in [sid for sid, session in self._sessions.items() if session.bot_id == bot_id]:
+            # Requests still holding the session must not write it back.
+            session = self._sessions.pop(session_id)
+            session.persist = False
+            session.dropped = True
+        await self.collection.delete_many({"bot_id": bot_id})
+
+    # The OrderedDict is only changed in code that doesn't await, so these
+    # changes are atomic on the event loop and need no lock.
+    def _put(self, session: ChatSession) -> List[ChatSession]:
+        """Caches the session and returns the sessions evicted to make room for it."""
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        evicted = []
+        while len(self._sessions) > self.capacity:
+            evicted.append(self._sessions.popitem(last=False)[1])
+        return evicted
+
+    async def _flush_evicted(self, sessions: List[ChatSession]):
+        for session in sessions:
+            try:
+                await self.flush(session)
+            except Exception as e:
+                print(f"Error persisting chat session {session.session_id}: {e}")
+                # Keep its buffered turns; it is first in line for the next eviction.
+                if session.session_id not in self._sessions:
+                    self._sessions[session.session_id] = session
+                    self._sessions.move_to_end(session.session_id, last=False)
+
+
+session_store = SessionStore(chat_sessions_collection, settings.SESSION_CACHE_SIZE)
@@ -17,4 +17,6 @@ database = client[settings.MONGO_DB_NAME]
 # Define collections
 users_collection = database["users"]
 bots_collection = database["bots"]
-api_keys_collection = database["api_keys"]
\ No newline at end of file
+api_keys_collection = database["api_keys"]
+chat_sessions_collection = database["chat_sessions"]
+rate_limits_collection = database["rate_limits"]
\ No newline at end of file
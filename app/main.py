@@ -1,8 +1,13 @@
 # app/main.py
 
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.api.v1.endpoints import auth, bots, api_keys, users # <-- Import users router
+from app.core.sessions import session_store
+from app.core.rate_limit import RateLimitExceeded
+from app.core.config import settings
+from app.core.garbage_collector import garbage_collector
 
 app = FastAPI(
     title="TwinlyAI API",
@@ -23,8 +28,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "Retry-After"],
 )
 
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # API Router Setup
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -34,6 +48,17 @@ api_router.include_router(users.router, prefix="/users", tags=["users"]) # <-- I
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def start_garbage_collector():
+    if settings.GC_ENABLED:
+        garbage_collector.start()
+
+@app.on_event("shutdown")
+async def flush_chat_sessions():
+    await garbage_collector.stop()
+    # Persist any buffered session turns before the worker exits
+    await session_store.flush_all()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to TwinlyAI API"}
\ No newline at end of file
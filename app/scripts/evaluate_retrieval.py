@@ -0,0 +1,279 @@
+# app/scripts/evaluate_retrieval.py
+
+"""
+Offline evaluation of retrieval configurations. No LLM calls are made.
+
+Sweeps chunk size, chunk overlap, k, FAISS index type and hybrid (BM25 + vector)
+search over the resumes under data/, and reports recall@k, MRR, the average
+number of context tokens sent to the LLM, index size and search latency:
+
+    python -m app.scripts.evaluate_retrieval questions.json \
+        --chunk-sizes 500,1000 --overlaps 100,200 --k 2,4,6 \
+        --index-types flat,flat_ip,hnsw --hybrid off,on --min-recall 0.9
+
+The question file is a JSON list of labeled questions. `document` is the file
+name of a resume under data/ and `relevant` lists passages from it that answer
+the question:
+
+    [{"question": "Where did he study?",
+      "document": "CV_Kurian_Gen_AUG25_new__ (1).pdf",
+      "relevant": ["Bachelor of Technology in Computer Science"]}]
+
+The embedding model must already be in the local HuggingFace cache
+(set HF_HUB_OFFLINE=1 to make sure nothing is downloaded).
+"""
+
+import argparse
+import json
+import math
+import re
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from app.core.config import settings
+from app.core.rag_pipeline import SOURCE_EXTENSIONS, extract_text_from_file, split_text
+
+INDEX_TYPES = ("flat", "flat_ip", "hnsw")
+# Reciprocal rank fusion constant for hybrid search
+RRF_K = 60
+
+
+class Question(NamedTuple):
+    question: str
+    document: str
+    relevant: List[str]
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.casefold())
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return max(1, round(len(text) / 4))
+
+
+def is_relevant(chunk: str, passage: str, threshold: float) -> bool:
+    """A chunk matches a passage if it contains it, or most of its words."""
+    chunk_text, passage_text = " ".join(tokenize(chunk)), " ".join(tokenize(passage))
+    if passage_text in chunk_text:
+        return True
+    passage_tokens = set(passage_text.split())
+    if not passage_tokens:
+        return False
+    return len(passage_tokens & set(chunk_text.split())) / len(passage_tokens) >= threshold
+
+
+class BM25:
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.docs = [Counter(tokenize(text)) for text in texts]
+        self.lengths = [sum(doc.values()) for doc in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        self.k1, self.b = k1, b
+        df = Counter(term for doc in self.docs for term in doc)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def top(self, query: str, n: int) -> List[int]:
+        terms = tokenize(query)
+        scores = []
+        for i, doc in enumerate(self.docs):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    norm = 1 - self.b + self.b * self.lengths[i] / self.avg_length
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+            scores.append(score)
+        return sorted(range(len(self.docs)), key=lambda i: scores[i], reverse=True)[:n]
+
+
+def build_store(texts: List[str], vectors: List[List[float]], embeddings, index_type: str) -> FAISS:
+    text_embeddings = list(zip(texts, vectors))
+    if index_type == "flat":
+        return FAISS.from_embeddings(text_embeddings, embeddings)
+    if index_type == "flat_ip":
+        return FAISS.from_embeddings(
+            text_embeddings, embeddings,
+            normalize_L2=True, distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+    if index_type == "hnsw":
+        store = FAISS(embeddings, faiss.IndexHNSWFlat(len(vectors[0]), 32), InMemoryDocstore(), {})
+        store.add_embeddings(text_embeddings)
+        return store
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def load_questions(path: Path) -> List[Question]:
+    items = json.loads(path.read_text(encoding="utf-8"))
+    if not items:
+        raise SystemExit(f"No questions in {path}")
+    return [Question(item["question"], item["document"], list(item["relevant"])) for item in items]
+
+
+def load_documents(data_dir: Path, names: set) -> Dict[str, str]:
+    """Reads each referenced resume once; the same file is often stored for several bots."""
+    documents = {}
+    for path in sorted(data_dir.rglob("*")):
+        if path.is_file() and path.suffix in SOURCE_EXTENSIONS and path.name in names and path.name not in documents:
+            documents[path.name] = extract_text_from_file(path)
+    missing = names - documents.keys()
+    if missing:
+        raise SystemExit(f"Documents not found under {data_dir}: {', '.join(sorted(missing))}")
+    # e.g. scanned PDFs; they would produce no chunks to index
+    empty = [name for name, text in documents.items() if not text.strip()]
+    if empty:
+        raise SystemExit(f"No text could be extracted from: {', '.join(sorted(empty))}")
+    return documents
+
+
+def retrieve(store: FAISS, bm25, texts: List[str], question: str, query_vector, k: int) -> List[str]:
+    if bm25 is None:
+        return [doc.page_content for doc, _ in store.similarity_search_with_score_by_vector(query_vector, k)]
+    fused = Counter()
+    dense = store.similarity_search_with_score_by_vector(query_vector, k * 4)
+    for rank, (doc, _) in enumerate(dense):
+        fused[doc.page_content] += 1 / (RRF_K + rank + 1)
+    for rank, i in enumerate(bm25.top(question, k * 4)):
+        fused[texts[i]] += 1 / (RRF_K + rank + 1)
+    return [text for text, _ in fused.most_common(k)]
+
+
+def evaluate(questions, stores, bm25s, chunk_texts, query_vectors, k: int, threshold: float) -> dict:
+    recalls, reciprocal_ranks, context_tokens, latencies = [], [], [], []
+    for question in questions:
+        started = time.perf_counter()
+        chunks = retrieve(
+            stores[question.document], bm25s.get(question.document), chunk_texts[question.document],
+            question.question, query_vectors[question.question], k
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        covered = sum(any(is_relevant(chunk, passage, threshold) for chunk in chunks) for passage in question.relevant)
+        recalls.append(covered / len(question.relevant) if question.relevant else 0.0)
+        first_hit = next(
+            (rank for rank, chunk in enumerate(chunks, 1)
+             if any(is_relevant(chunk, passage, threshold) for passage in question.relevant)),
+            None
+        )
+        reciprocal_ranks.append(1 / first_hit if first_hit else 0.0)
+        context_tokens.append(sum(estimate_tokens(chunk) for chunk in chunks))
+
+    latencies.sort()
+    return {
+        "recall_at_k": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "avg_context_tokens": statistics.mean(context_tokens),
+        "search_ms_p50": statistics.median(latencies),
+        "search_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def sweep(args, questions: List[Question], documents: Dict[str, str]) -> List[dict]:
+    embeddings = HuggingFaceEmbeddings(model_name=args.model)
+    query_vectors = {q.question: embeddings.embed_query(q.question) for q in questions}
+    results = []
+    for chunk_size in args.chunk_sizes:
+        for overlap in args.overlaps:
+            if overlap >= chunk_size:
+                continue
+            chunk_texts = {
+                name: [doc.page_content for doc in split_text(text, chunk_size, overlap)]
+                for name, text in documents.items()
+            }
+            chunk_vectors = {name: embeddings.embed_documents(texts) for name, texts in chunk_texts.items()}
+            for index_type in args.index_types:
+                stores = {
+                    name: build_store(chunk_texts[name], chunk_vectors[name], embeddings, index_type)
+                    for name in documents
+                }
+                index_bytes = sum(faiss.serialize_index(store.index).nbytes for store in stores.values())
+                for hybrid in args.hybrid:
+                    bm25s = {name: BM25(texts) for name, texts in chunk_texts.items()} if hybrid else {}
+                    for k in args.k:
+                        row = {
+                            "chunk_size": chunk_size,
+                            "chunk_overlap": overlap,
+                            "index": index_type,
+                            "hybrid": hybrid,
+                            "k": k,
+                            "index_bytes": index_bytes,
+                        }
+                        row.update(evaluate(questions, stores, bm25s, chunk_texts, query_vectors, k, args.match_threshold))
+                        results.append(row)
+                        print_row(row)
+    return results
+
+
+COLUMNS = [
+    ("chunk_size", "chunk", "{}"), ("chunk_overlap", "overlap", "{}"), ("index", "index", "{}"),
+    ("hybrid", "hybrid", "{}"), ("k", "k", "{}"), ("recall_at_k", "recall@k", "{:.3f}"), ("mrr", "mrr", "{:.3f}"),
+    ("avg_context_tokens", "ctx_tokens", "{:.0f}"), ("index_bytes", "index_kb", "{}"),
+    ("search_ms_p50", "p50_ms", "{:.2f}"), ("search_ms_p95", "p95_ms", "{:.2f}"),
+]
+
+
+def print_row(row: dict):
+    values = []
+    for key, _, fmt in COLUMNS:
+        value = row[key] // 1024 if key == "index_bytes" else row[key]
+        values.append(fmt.format(value).rjust(10))
+    print("".join(values))
+
+
+def csv_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency offline.")
+    parser.add_argument("questions", type=Path, help="JSON file with labeled questions")
+    parser.add_argument("--data-dir", type=Path, default=Path("data"))
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--chunk-sizes", type=csv_ints, default=[settings.CHUNK_SIZE])
+    parser.add_argument("--overlaps", type=csv_ints, default=[settings.CHUNK_OVERLAP])
+    parser.add_argument("--k", type=csv_ints, default=[settings.RETRIEVAL_TOP_K])
+    parser.add_argument("--index-types", type=lambda v: v.split(","), default=["flat"])
+    parser.add_argument("--hybrid", type=lambda v: [x == "on" for x in v.split(",")], default=[False],
+                        help="comma-separated on/off")
+    parser.add_argument("--match-threshold", type=float, default=0.8,
+                        help="share of a passage's words a chunk must contain to count as relevant")
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="quality bar used to pick the recommended configuration")
+    parser.add_argument("--output", type=Path, help="write all results to this JSON file")
+    args = parser.parse_args()
+
+    unknown = set(args.index_types) - set(INDEX_TYPES)
+    if unknown:
+        parser.error(f"unknown index types: {', '.join(sorted(unknown))}")
+
+    questions = load_questions(args.questions)
+    documents = load_documents(args.data_dir, {q.document for q in questions})
+    print(f"{len(questions)} questions over {len(documents)} documents")
+    print("".join(label.rjust(10) for _, label, _ in COLUMNS))
+    results = sweep(args, questions, documents)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    # The cheapest prompt that meets the quality bar is the fastest for the LLM.
+    passing = [row for row in results if row["recall_at_k"] >= args.min_recall]
+    if not passing:
+        print(f"\nNo configuration reached recall@k >= {args.min_recall}.")
+        return
+    best = min(passing, key=lambda row: (row["avg_context_tokens"], row["search_ms_p50"], -row["mrr"]))
+    print(f"\nRecommended (recall@k >= {args.min_recall}, fewest context tokens):")
+    print_row(best)
+
+
+if __name__ == "__main__":
+    main()
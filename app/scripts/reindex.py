@@ -0,0 +1,264 @@
+# app/scripts/reindex.py
+
+"""
+Rebuilds every bot's FAISS index from the source documents stored under data/.
+
+Run it from the backend root after changing the embedding model, the splitter
+settings or the index format:
+
+    python -m app.scripts.reindex [--workers 4] [--batch-size 512] [--dry-run] [--restart]
+
+Bots are reconciled against `bots_collection` first: indexes left in the old
+`data/<bot_id>` layout are moved to `data/<user_id>/<bot_id>`, and directories
+that belong to no bot are reported. Text extraction and splitting run in a
+process pool, embeddings are computed in large batches shared across bots, and
+each new index is swapped in atomically so live bots keep serving. Finished bots
+are checkpointed, so an interrupted run picks up where it stopped.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from app.core.config import settings
+from app.core.rag_pipeline import (
+    extract_text_from_file, find_source_documents, save_index_atomically, split_text
+)
+from app.db.session import bots_collection
+
+# Bump when the on-disk index format changes so existing checkpoints are ignored.
+INDEX_FORMAT_VERSION = 1
+CHECKPOINT_NAME = ".reindex_checkpoint.json"
+
+
+class BotJob(NamedTuple):
+    bot_id: str
+    user_id: str
+    data_path: str
+    source: str
+
+
+def index_fingerprint() -> str:
+    return json.dumps({
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "chunk_size": settings.CHUNK_SIZE,
+        "chunk_overlap": settings.CHUNK_OVERLAP,
+        "index_format": INDEX_FORMAT_VERSION,
+    }, sort_keys=True)
+
+
+async def load_bot_owners() -> Dict[str, str]:
+    bots = await bots_collection.find({"deleted_at": None}, {"user_id": 1}).to_list(None)
+    return {str(bot["_id"]): str(bot["user_id"]) for bot in bots if bot.get("user_id")}
+
+
+def reconcile(data_dir: Path, owners: Dict[str, str], dry_run: bool) -> Tuple[List[BotJob], dict]:
+    """
+    Moves bot directories into the `data/<user_id>/<bot_id>` layout and returns
+    a job for every bot that has a source document.
+    """
+    report = {"moved": [], "conflicts": [], "orphans": [], "missing_sources": []}
+    locations: Dict[str, Path] = {}
+
+    def relocate(current: Path, bot_id: str):
+        target = data_dir / owners[bot_id] / bot_id
+        if target.exists():
+            report["conflicts"].append(f"{current} (already at {target})")
+            return
+        report["moved"].append(f"{current} -> {target}")
+        if dry_run:
+            locations[bot_id] = current
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(current, target)
+        locations[bot_id] = target
+
+    for entry in sorted(p for p in data_dir.iterdir() if p.is_dir()):
+        if entry.name in owners:
+            relocate(entry, entry.name)
+            continue
+        children = [p for p in entry.iterdir() if p.is_dir()]
+        if not any(child.name in owners for child in children):
+            report["orphans"].append(str(entry))
+            continue
+        for child in children:
+            if child.name not in owners:
+                report["orphans"].append(str(child))
+            elif owners[child.name] != entry.name:
+                relocate(child, child.name)
+
+    jobs = []
+    for bot_id, user_id in owners.items():
+        data_path = locations.get(bot_id, data_dir / user_id / bot_id)
+        sources = find_source_documents(data_path)
+        if not sources:
+            report["missing_sources"].append(bot_id)
+            continue
+        jobs.append(BotJob(bot_id, user_id, str(data_path), str(sources[0])))
+    return jobs, report
+
+
+def prepare_chunks(job: BotJob) -> Tuple[BotJob, List[str]]:
+    """Runs in a worker process: extracts and splits a bot's source document."""
+    text = extract_text_from_file(Path(job.source))
+    return job, [doc.page_content for doc in split_text(text)]
+
+
+class Checkpoint:
+    """Records finished bots for the current index fingerprint."""
+    def __init__(self, path: Path, fingerprint: str, restart: bool):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.done = set()
+        if path.exists() and not restart:
+            state = json.loads(path.read_text(encoding="utf-8"))
+            if state.get("fingerprint") == fingerprint:
+                self.done = set(state.get("done", []))
+
+    def mark_done(self, bot_id: str):
+        self.done.add(bot_id)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"fingerprint": self.fingerprint, "done": sorted(self.done)}),
+            encoding="utf-8"
+        )
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Removes the checkpoint once a run has finished, so the next run starts fresh."""
+        self.done = set()
+        if self.path.exists():
+            self.path.unlink()
+
+
+class Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.chunks = 0
+        self.started = time.monotonic()
+
+    def report(self, bot_id: str, message: str):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        print(
+            f"[{self.done + self.failed}/{self.total}] {bot_id}: {message} "
+            f"| {self.done / elapsed:.2f} bots/s, {self.chunks / elapsed:.1f} chunks/s"
+        )
+
+
+class EmbeddingBatcher:
+    """
+    Collects chunks from several bots and embeds them in one call once
+    `batch_size` texts are pending, then builds and swaps in each bot's index.
+    """
+    def __init__(self, embeddings, batch_size: int, checkpoint: Checkpoint, progress: Progress):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.pending: List[Tuple[BotJob, List[str]]] = []
+        self.pending_texts = 0
+
+    def add(self, job: BotJob, texts: List[str]):
+        self.pending.append((job, texts))
+        self.pending_texts += len(texts)
+        if self.pending_texts >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending, self.pending_texts = self.pending, [], 0
+        vectors = self.embeddings.embed_documents([text for _, texts in pending for text in texts])
+        offset = 0
+        for job, texts in pending:
+            bot_vectors = vectors[offset:offset + len(texts)]
+            offset += len(texts)
+            try:
+                vector_store = FAISS.from_embeddings(list(zip(texts, bot_vectors)), self.embeddings)
+                save_index_atomically(vector_store, Path(job.data_path) / "faiss_index")
+            except Exception as e:
+                self.progress.failed += 1
+                self.progress.report(job.bot_id, f"failed: {e}")
+                continue
+            self.checkpoint.mark_done(job.bot_id)
+            self.progress.done += 1
+            self.progress.chunks += len(texts)
+            self.progress.report(job.bot_id, f"{len(texts)} chunks")
+
+
+def print_report(report: dict):
+    for key, label in [
+        ("moved", "Moved to data/<user_id>/<bot_id>"),
+        ("conflicts", "Not moved, canonical directory already exists"),
+        ("orphans", "Directories with no matching bot"),
+        ("missing_sources", "Bots without a source document"),
+    ]:
+        if report[key]:
+            print(f"{label} ({len(report[key])}):")
+            for item in report[key]:
+                print(f"  {item}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild all bot indexes under data/.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes used for text extraction and splitting")
+    parser.add_argument("--batch-size", type=int, default=512,
+                        help="chunks embedded per batch across bots")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and rebuild every bot")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be moved and rebuilt")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    owners = asyncio.run(load_bot_owners())
+    jobs, report = reconcile(data_dir, owners, args.dry_run)
+    print_report(report)
+
+    checkpoint = Checkpoint(data_dir / CHECKPOINT_NAME, index_fingerprint(), args.restart)
+    jobs = [job for job in jobs if job.bot_id not in checkpoint.done]
+    print(f"{len(jobs)} bots to re-index ({len(checkpoint.done)} already done).")
+    if args.dry_run:
+        return
+    if not jobs:
+        # A resumed run whose remaining bots were all done already
+        checkpoint.clear()
+        return
+
+    progress = Progress(len(jobs))
+    embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+    batcher = EmbeddingBatcher(embeddings, args.batch_size, checkpoint, progress)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(prepare_chunks, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                _, texts = future.result()
+                if not texts:
+                    raise ValueError("no text extracted")
+            except Exception as e:
+                progress.failed += 1
+                progress.report(job.bot_id, f"failed: {e}")
+                continue
+            batcher.add(job, texts)
+    batcher.flush()
+
+    elapsed = time.monotonic() - progress.started
+    print(f"Re-indexed {progress.done} bots ({progress.chunks} chunks) in {elapsed:.1f}s, {progress.failed} failed.")
+    # The checkpoint only marks interrupted or partly failed runs for resuming.
+    if not progress.failed:
+        checkpoint.clear()
+
+
+if __name__ == "__main__":
+    main()
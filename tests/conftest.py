@@ -0,0 +1,10 @@
+# tests/conftest.py
+
+import os
+
+# Settings are read at import time; provide placeholders so app modules import offline.
+for name in (
+    "MONGO_CONNECTION_STRING", "SECRET_KEY", "GROQ_API_KEY",
+    "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "GITHUB_CLIENT_ID", "GITHUB_CLIENT_SECRET",
+):
+    os.environ.setdefault(name, "test")
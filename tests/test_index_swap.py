@@ -0,0 +1,39 @@
+# tests/test_index_swap.py
+
+import os
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core.rag_pipeline import resolve_index_dir, save_index_atomically
+
+embeddings = DeterministicFakeEmbedding(size=8)
+
+
+def make_store(text: str) -> FAISS:
+    return FAISS.from_texts([text], embeddings)
+
+
+def test_swap_replaces_plain_directory_index(tmp_path):
+    index_path = tmp_path / "faiss_index"
+    make_store("old").save_local(str(index_path))
+
+    save_index_atomically(make_store("new"), index_path)
+
+    assert index_path.is_symlink()
+    store = FAISS.load_local(str(resolve_index_dir(index_path)), embeddings, allow_dangerous_deserialization=True)
+    assert [doc.page_content for doc in store.docstore._dict.values()] == ["new"]
+
+
+def test_reader_uses_newest_version_during_first_swap(tmp_path):
+    # State between moving the plain directory aside and creating the symlink
+    index_path = tmp_path / "faiss_index"
+    make_store("old").save_local(str(tmp_path / "faiss_index.0"))
+    make_store("new").save_local(str(tmp_path / "faiss_index.123"))
+
+    assert not os.path.exists(index_path)
+    assert resolve_index_dir(index_path) == tmp_path / "faiss_index.123"
+
+
+def test_missing_index_resolves_to_none(tmp_path):
+    assert resolve_index_dir(tmp_path / "faiss_index") is None
@@ -0,0 +1,51 @@
+# tests/test_rate_limit.py
+
+import asyncio
+
+import pytest
+
+from app.core.rate_limit import AdmissionController, MemoryRateBackend, RateLimitExceeded
+
+
+def make_controller(per_minute=60, burst=2, max_in_flight=1, max_queue=0, queue_timeout=0.05):
+    backend = MemoryRateBackend(per_minute, burst)
+    return AdmissionController("chat", backend, max_in_flight, max_queue, queue_timeout), backend
+
+
+def test_concurrency_shed_does_not_spend_a_token():
+    async def scenario():
+        controller, backend = make_controller(per_minute=1, burst=2)
+        lease = await controller.acquire("tenant")
+        for _ in range(5):
+            with pytest.raises(RateLimitExceeded, match="concurrent"):
+                await controller.acquire("tenant")
+        lease.release()
+        # One token is left from the burst of two.
+        lease = await controller.acquire("tenant")
+        lease.release()
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_refunds_the_token():
+    async def scenario():
+        controller, backend = make_controller(per_minute=1, burst=2, max_queue=1)
+        lease = await controller.acquire("tenant")
+        with pytest.raises(RateLimitExceeded, match="concurrent"):
+            await controller.acquire("tenant")
+        lease.release()
+        lease = await controller.acquire("tenant")
+        lease.release()
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_applies_after_burst():
+    async def scenario():
+        controller, _ = make_controller(per_minute=1, burst=1, max_in_flight=5)
+        (await controller.acquire("tenant")).release()
+        with pytest.raises(RateLimitExceeded, match="Rate limit") as exc:
+            await controller.acquire("tenant")
+        assert exc.value.retry_after >= 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+# tests/test_sessions.py
+
+import asyncio
+
+from app.core.sessions import SessionStore
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for SessionStore."""
+    def __init__(self):
+        self.docs = {}
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc, turns=list(doc["turns"])) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            if not upsert:
+                return
+            doc = self.docs[query["_id"]] = {"turns": []}
+        doc.update(update["$set"])
+        push = update["$push"]["turns"]
+        doc["turns"] = (doc["turns"] + push["$each"])[push["$slice"]:]
+
+    async def delete_many(self, query):
+        for key in [k for k, doc in self.docs.items() if doc["bot_id"] == query["bot_id"]]:
+            del self.docs[key]
+
+
+def stored_contents(collection, session_id):
+    from bson import ObjectId
+    return [turn["c"] for turn in collection.docs[ObjectId(session_id)]["turns"]]
+
+
+def test_turn_recorded_after_eviction_is_flushed():
+    async def scenario():
+        collection = FakeCollection()
+        store = SessionStore(collection, capacity=2)
+        session = await store.create("bot", "user")
+        await store.record_turn(session, "q0", "a0")
+
+        # Other sessions push the first one out of the LRU while its request is running.
+        for _ in range(3):
+            await store.create("bot", "user")
+        await store.record_turn(session, "q1", "a1")
+        await store.flush_all()
+        return collection, session
+
+    collection, session = asyncio.run(scenario())
+    assert stored_contents(collection, session.session_id) == ["q0", "a0", "q1", "a1"]
+
+
+def test_dropped_session_is_not_written_back():
+    async def scenario():
+        collection = FakeCollection()
+        store = SessionStore(collection, capacity=2)
+        session = await store.create("bot", "user")
+        await store.record_turn(session, "q0", "a0")
+        await store.drop_bot("bot")
+        await store.record_turn(session, "q1", "a1")
+        await store.flush_all()
+        return collection
+
+    assert asyncio.run(scenario()).docs == {}